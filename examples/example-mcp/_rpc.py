@@ -0,0 +1,281 @@
+"""
+Shared gRPC plumbing for the Python payment examples.
+
+Channel pooling, request construction and response parsing for the
+PaymentService live here so the MCP server (payments.py) and the example-py
+client build and read messages the same way.
+"""
+import asyncio
+import atexit
+import itertools
+import os
+import sys
+import threading
+import time
+from decimal import Decimal, ROUND_HALF_UP
+from typing import Dict, Any, Iterator, List, Optional
+
+from grpc import aio
+
+# Add path for generated protobuf files
+PROTO_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "example-py", "generated")
+sys.path.append(PROTO_PATH)
+
+from payment_pb2 import (
+    AttemptStatus,
+    PaymentsAuthorizeRequest,
+    PaymentsAuthorizeResponse,
+    PaymentsSyncRequest,
+    PaymentsSyncResponse,
+    AuthenticationType,
+    BrowserInformation,
+    PaymentAddress,
+)
+from payment_pb2_grpc import PaymentServiceStub
+
+# Channel options: keep the HTTP/2 connection alive between calls
+CHANNEL_OPTIONS = [
+    ("grpc.keepalive_time_ms", 30000),
+    ("grpc.keepalive_permit_without_calls", 1),
+    ("grpc.http2.max_pings_without_data", 0),
+]
+
+# Deadline for each RPC so a stalled connection cannot hang a caller
+RPC_TIMEOUT_SECONDS = 10.0
+
+# Number of channels (and hence TCP connections) opened per gRPC server URL.
+# A single channel multiplexes every call over one connection, which becomes
+# the bottleneck under concurrent calls.
+POOL_SIZE = max(1, int(os.environ.get("GRPC_CHANNEL_POOL_SIZE", "4")))
+
+# Async channels and stubs are cached per server URL so that repeated calls
+# reuse the established connections instead of reconnecting every time.
+# They are only ever touched from the RPC loop thread, so no locking is needed.
+_CHANNEL_CACHE: Dict[str, List[aio.Channel]] = {}
+_STUB_CACHE: Dict[str, Iterator[PaymentServiceStub]] = {}
+
+# Static request parts shared by every authorize call
+_DEFAULT_BROWSER_INFO = BrowserInformation(
+    user_agent="Mozilla/5.0 (Macintosh; Intel Mac OS X)",
+    accept_header="text/html,application/xhtml+xml",
+    language="en-US",
+    color_depth=24,
+    screen_height=1080,
+    screen_width=1920,
+    java_enabled=False
+)
+
+# Authorize request fields that are identical for every call, serialized once
+# so each request is seeded with a single native parse
+_AUTHORIZE_TEMPLATE_BYTES = PaymentsAuthorizeRequest(
+    # The server rejects requests without an address, so send an empty one
+    address=PaymentAddress(),
+    auth_type=AuthenticationType.THREE_DS,
+    enrolled_for_3ds=True,
+    request_incremental_authorization=False,
+    browser_info=_DEFAULT_BROWSER_INFO
+).SerializeToString()
+
+# AttemptStatus enum values -> string representation
+_STATUS_MAP = {
+    AttemptStatus.AUTHENTICATION_PENDING: "pending_authentication",
+    AttemptStatus.CHARGED: "charged",
+    AttemptStatus.PENDING: "pending",
+}
+
+# Reference IDs only need to be unique, not unpredictable: a random per-process
+# prefix plus a monotonic counter avoids a getrandom syscall per request
+_REF_PREFIX = os.urandom(3).hex()
+_REF_COUNTER = itertools.count(int(time.time()))
+
+def _create_channel(url: str, channel_id: int) -> aio.Channel:
+    """Create a channel that does not share its subchannel with the rest of the pool"""
+    options = CHANNEL_OPTIONS + [
+        ("grpc.use_local_subchannel_pool", 1),
+        # Distinct channel args keep gRPC from coalescing pooled channels
+        ("grpc.channel_id", channel_id),
+    ]
+    return aio.insecure_channel(url, options=options)
+
+def _get_stub(url: str) -> PaymentServiceStub:
+    """Return the next pooled PaymentServiceStub for the given gRPC server URL"""
+    stubs = _STUB_CACHE.get(url)
+    if stubs is None:
+        channels = [_create_channel(url, i) for i in range(POOL_SIZE)]
+        _CHANNEL_CACHE[url] = channels
+        # One stub per channel, built once: stubs are safe to share, while
+        # building them per call re-creates every RPC callable each time
+        stubs = itertools.cycle([PaymentServiceStub(channel) for channel in channels])
+        _STUB_CACHE[url] = stubs
+    return next(stubs)
+
+async def _close_channels() -> None:
+    """Close all cached channels"""
+    for channels in _CHANNEL_CACHE.values():
+        for channel in channels:
+            await channel.close()
+    _CHANNEL_CACHE.clear()
+    _STUB_CACHE.clear()
+
+# A single long-lived event loop owns every channel, so RPCs from any caller
+# (and any caller's event loop) are multiplexed as concurrent HTTP/2 streams
+# on the same pooled connections. It is started on first use.
+_RPC_LOOP: Optional[asyncio.AbstractEventLoop] = None
+_RPC_LOOP_LOCK = threading.Lock()
+
+def _get_rpc_loop() -> asyncio.AbstractEventLoop:
+    """Return the RPC loop, starting its background thread if needed"""
+    global _RPC_LOOP
+    if _RPC_LOOP is None:
+        with _RPC_LOOP_LOCK:
+            if _RPC_LOOP is None:
+                loop = asyncio.new_event_loop()
+                threading.Thread(target=loop.run_forever, name="grpc-rpc-loop", daemon=True).start()
+                atexit.register(_shutdown_rpc_loop, loop)
+                _RPC_LOOP = loop
+    return _RPC_LOOP
+
+def _shutdown_rpc_loop(loop: asyncio.AbstractEventLoop) -> None:
+    """Close pooled channels on the loop that owns them, then stop the loop"""
+    asyncio.run_coroutine_threadsafe(_close_channels(), loop).result(timeout=5)
+    loop.call_soon_threadsafe(loop.stop)
+
+async def _run_on_rpc_loop(coro):
+    """Run a coroutine on the RPC loop and await its result from the caller's loop"""
+    return await asyncio.wrap_future(asyncio.run_coroutine_threadsafe(coro, _get_rpc_loop()))
+
+async def _authorize(url: str, request: PaymentsAuthorizeRequest) -> PaymentsAuthorizeResponse:
+    """Issue PaymentAuthorize on a pooled stub; must run on the RPC loop"""
+    return await _get_stub(url).PaymentAuthorize(
+        request, timeout=RPC_TIMEOUT_SECONDS, wait_for_ready=True
+    )
+
+async def _sync(url: str, request: PaymentsSyncRequest) -> PaymentsSyncResponse:
+    """Issue PaymentSync on a pooled stub; must run on the RPC loop"""
+    return await _get_stub(url).PaymentSync(
+        request, timeout=RPC_TIMEOUT_SECONDS, wait_for_ready=True
+    )
+
+async def send_authorize(url: str, request: PaymentsAuthorizeRequest) -> PaymentsAuthorizeResponse:
+    """Send a PaymentAuthorize RPC to the given gRPC server over the shared pool"""
+    return await _run_on_rpc_loop(_authorize(url, request))
+
+async def send_sync(url: str, request: PaymentsSyncRequest) -> PaymentsSyncResponse:
+    """Send a PaymentSync RPC to the given gRPC server over the shared pool"""
+    return await _run_on_rpc_loop(_sync(url, request))
+
+def _generate_reference_id(prefix: str) -> str:
+    """Generate a process-unique reference ID with the given prefix"""
+    return f"{prefix}{_REF_PREFIX}{next(_REF_COUNTER):x}"
+
+def to_minor_units(amount: float) -> int:
+    """Convert a major-unit amount to minor units (e.g. 19.99 -> 1999)"""
+    # Go through the decimal representation so values like 19.99 do not
+    # truncate to 1998 the way int(19.99 * 100) does
+    return int((Decimal(str(amount)) * 100).to_integral_value(rounding=ROUND_HALF_UP))
+
+def build_authorize_request(
+    minor_amount: int,
+    currency: int,
+    payment_method: int,
+    card_details: Dict[str, str],
+    email: str,
+    reference_id: Optional[str] = None,
+    connector: Optional[int] = None,
+    api_key: str = "",
+    key1: str = "",
+    browser_info: Optional[BrowserInformation] = None
+) -> PaymentsAuthorizeRequest:
+    """
+    Build a PaymentsAuthorizeRequest from the static template.
+
+    Args:
+        minor_amount: Amount in minor units
+        currency: Protobuf Currency enum value
+        payment_method: Protobuf PaymentMethod enum value
+        card_details: Dictionary containing card information
+        email: Customer email
+        reference_id: Reference ID for the transaction (generated if not given)
+        connector: Protobuf Connector enum value; when omitted, connector and
+            credentials are left for the caller to send in request metadata
+        api_key: API key for the payment processor
+        key1: Additional authentication key
+        browser_info: Browser information to send instead of the template's default
+    """
+    # Start from the static template, then fill in the per-call fields
+    request = PaymentsAuthorizeRequest()
+    request.ParseFromString(_AUTHORIZE_TEMPLATE_BYTES)
+    request.amount = minor_amount
+    request.minor_amount = minor_amount
+    request.currency = currency
+    if connector is not None:
+        request.connector = connector
+        request.auth_creds.body_key.api_key = api_key
+        request.auth_creds.body_key.key1 = key1
+    request.payment_method = payment_method
+    card = request.payment_method_data.card
+    card.card_number = card_details["card_number"]
+    card.card_exp_month = card_details["card_exp_month"]
+    card.card_exp_year = card_details["card_exp_year"]
+    card.card_cvc = card_details["card_cvc"]
+    request.connector_request_reference_id = reference_id or _generate_reference_id("ref_")
+    request.email = email
+    if browser_info is not None:
+        request.browser_info.CopyFrom(browser_info)
+    return request
+
+def build_sync_request(
+    resource_id: str,
+    reference_id: Optional[str] = None,
+    connector: Optional[int] = None,
+    api_key: str = "",
+    key1: str = ""
+) -> PaymentsSyncRequest:
+    """
+    Build a PaymentsSyncRequest.
+
+    Args:
+        resource_id: ID of the payment to sync
+        reference_id: Reference ID for the transaction (generated if not given)
+        connector: Protobuf Connector enum value; when omitted, connector and
+            credentials are left for the caller to send in request metadata
+        api_key: API key for the payment processor
+        key1: Additional authentication key
+    """
+    request = PaymentsSyncRequest(
+        resource_id=resource_id,
+        connector_request_reference_id=reference_id or _generate_reference_id("conn_req_")
+    )
+    if connector is not None:
+        request.connector = connector
+        request.auth_creds.body_key.api_key = api_key
+        request.auth_creds.body_key.key1 = key1
+    return request
+
+def parse_status(response) -> str:
+    """Map a response's status enum to its string representation"""
+    status = _STATUS_MAP.get(response.status)
+    if status is None:
+        # Fall back to the enum name, e.g. AUTHORIZED -> "authorized"
+        try:
+            status = AttemptStatus.Name(response.status).lower()
+        except ValueError:
+            status = "unknown"
+    return status
+
+def parse_authorize_response(response) -> Dict[str, Any]:
+    """Extract status, payment ID and redirect URL from a PaymentsAuthorizeResponse"""
+    # Generated message fields are always present and default to ""
+    return {
+        "status": parse_status(response),
+        "payment_id": response.resource_id.connector_transaction_id,
+        # Redirection endpoint, empty when the connector did not request one
+        "redirect_url": response.redirection_data.form.endpoint,
+    }
+
+def parse_sync_response(response) -> Dict[str, Any]:
+    """Extract status and payment ID from a PaymentsSyncResponse"""
+    return {
+        "status": parse_status(response),
+        "payment_id": response.resource_id.connector_transaction_id,
+    }
@@ -0,0 +1,60 @@
+"""
+Mock implementations of the payment tools in payments.py.
+
+These return canned responses without a gRPC server or the generated protobuf
+code, for exercising test_payments.py offline (USE_MOCK_PAYMENTS=1).
+"""
+import os
+from typing import Dict, Any, Optional
+
+async def authorize_payment(
+    amount: float,
+    currency: str,
+    connector: str,
+    api_key: str = "",
+    payment_method: str = "card",
+    card_details: Dict[str, str] = None,
+    email: str = "test@example.com",
+    reference_id: Optional[str] = None,
+    grpc_server_url: str = "localhost:8000"
+) -> Dict[str, Any]:
+    """Mock of payments.authorize_payment"""
+    return {
+        "status": "authorized",
+        "payment_id": "pay_" + os.urandom(8).hex(),
+        "amount": amount,
+        "currency": currency,
+        "connector": connector,
+        "reference_id": reference_id or "ref_" + os.urandom(8).hex(),
+        "created_at": "2024-03-21T10:00:00Z",
+        "note": "Mock implementation"
+    }
+
+async def sync_payment(
+    payment_id: str,
+    connector: str,
+    api_key: str = "",
+    reference_id: Optional[str] = None,
+    grpc_server_url: str = "localhost:8000"
+) -> Dict[str, Any]:
+    """Mock of payments.sync_payment"""
+    return {
+        "status": "succeeded",
+        "payment_id": payment_id,
+        "connector": connector,
+        "reference_id": reference_id,
+        "last_synced_at": "2024-03-21T10:05:00Z",
+        "note": "Mock implementation"
+    }
+
+def get_payment_details(payment_id: str) -> Dict[str, Any]:
+    """Mock of payments.get_payment_details"""
+    return {
+        "payment_id": payment_id,
+        "status": "succeeded",
+        "amount": 1000,
+        "currency": "USD",
+        "payment_method": "card",
+        "created_at": "2024-03-21T10:00:00Z",
+        "updated_at": "2024-03-21T10:05:00Z"
+    }
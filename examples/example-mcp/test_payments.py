@@ -1,21 +1,30 @@
 #!/usr/bin/env python3
-from payments import authorize_payment, sync_payment, get_payment_details
-from payment_pb2 import Connector, Currency
+import asyncio
 import os
 
+# Set USE_MOCK_PAYMENTS=1 to run the flow without a gRPC server
+USE_MOCK_PAYMENTS = os.environ.get("USE_MOCK_PAYMENTS") == "1"
+
+if USE_MOCK_PAYMENTS:
+    from mock_payments import authorize_payment, sync_payment, get_payment_details
+else:
+    from payments import authorize_payment, sync_payment, get_payment_details
+    from payment_pb2 import Connector, Currency
+
 # Razorpay test credentials
 RAZORPAY_API_KEY = "<YOUR_RAZORPAY_API_KEY>"  # Replace with your Razorpay API key
 RAZORPAY_KEY1 = "<YOUR_RAZORPAY_KEY1>"  # Replace with your Razorpay Key1
 
-def test_payment_flow():
+async def test_payment_flow():
     print("\n=== Testing Payment Flow ===\n")
     
     # Test payment authorization
     print("1. Testing payment authorization...")
-    print(f"Using currency: INR (enum value: {Currency.INR})")
-    print(f"Using connector: RAZORPAY (enum value: {Connector.RAZORPAY})")
+    if not USE_MOCK_PAYMENTS:
+        print(f"Using currency: INR (enum value: {Currency.INR})")
+        print(f"Using connector: RAZORPAY (enum value: {Connector.RAZORPAY})")
     
-    auth_result = authorize_payment(
+    auth_result = await authorize_payment(
         amount=1000.00,  # Razorpay expects amount in paise (1000 INR)
         currency="INR",
         connector="RAZORPAY",
@@ -43,7 +52,7 @@ def test_payment_flow():
         
     # Test payment sync
     print("2. Testing payment sync...")
-    sync_result = sync_payment(
+    sync_result = await sync_payment(
         payment_id=payment_id,
         connector="RAZORPAY",
         api_key=RAZORPAY_API_KEY
@@ -62,4 +71,4 @@ def test_payment_flow():
     print("✅ Details:", "success" if "error" not in details_result else "failed")
 
 if __name__ == "__main__":
-    test_payment_flow() 
\ No newline at end of file
+    asyncio.run(test_payment_flow())
\ No newline at end of file
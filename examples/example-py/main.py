@@ -2,15 +2,15 @@ import grpc
 import os
 import sys
 
+# Use the native upb protobuf backend unless the environment overrides it;
+# this must be set before any generated module is imported
+os.environ.setdefault("PROTOCOL_BUFFERS_PYTHON_IMPLEMENTATION", "upb")
+
 sys.path.append("./generated")
+# Shared request builders live alongside the MCP example
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "example-mcp"))
 
 from payment_pb2 import (
-    PaymentsAuthorizeRequest,
-    PaymentsSyncRequest,
-    Card,
-    PaymentMethodData,
-    PaymentAddress,
-    AuthenticationType,
     PaymentsAuthorizeResponse,
     PaymentsSyncResponse,
     Currency,
@@ -18,6 +18,7 @@ from payment_pb2 import (
     BrowserInformation,
 )
 from payment_pb2_grpc import PaymentServiceStub
+from _rpc import RPC_TIMEOUT_SECONDS, build_authorize_request, build_sync_request
 from typing import Union
 
 def get_env_variable(var_name: str, default: str) -> str:
@@ -35,86 +36,72 @@ metadata = [
     ('x-key1',key1)
 ]
 
+# Browser information sent with authorize requests, built once
+BROWSER_INFO = BrowserInformation(
+    user_agent="Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7)",
+    accept_header="text/html,application/xhtml+xml",
+    language="en-US",
+    color_depth=24,
+    screen_height=1080,
+    screen_width=1920,
+    java_enabled=False,
+)
+
 def make_payment_authorization_request(url: str) -> Union[PaymentsAuthorizeResponse, None]:
     """Send a payment authorization request."""
     try:
-        channel = grpc.insecure_channel(url)
-        client = PaymentServiceStub(channel)
-
-        # Create request with updated values
-        request = PaymentsAuthorizeRequest(
-            amount=1000,
-            currency=Currency.USD,
-            # connector=Connector.RAZORPAY,
-            # auth_creds=AuthType(
-            #     body_key=BodyKey(api_key=api_key, key1=key1)
-            # ),
-            payment_method=PaymentMethod.CARD,
-            payment_method_data=PaymentMethodData(
-                card=Card(
-                    card_number="5123456789012346",
-                    card_exp_month="03",
-                    card_exp_year="2030",
-                    card_cvc="100",
-                )
-            ),
-            address=PaymentAddress(),
-            auth_type=AuthenticationType.THREE_DS,
-            connector_request_reference_id="ref_12345",
-            enrolled_for_3ds=True,
-            request_incremental_authorization=False,
-            minor_amount=1000,
-            email="example@example.com",
-            browser_info=BrowserInformation(
-                user_agent="Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7)",
-                accept_header="text/html,application/xhtml+xml",
-                language="en-US",
-                color_depth=24,
-                screen_height=1080,
-                screen_width=1920,
-                java_enabled=False,
-            ),
-            connector_customer="cus_131",
-            return_url="www.google.com"
-        )
-
-        # TODO set connector and auth in headers
-        return client.PaymentAuthorize(request,metadata=metadata)
+        with grpc.insecure_channel(url) as channel:
+            client = PaymentServiceStub(channel)
+
+            # Create request with updated values
+            request = build_authorize_request(
+                minor_amount=1000,
+                currency=Currency.USD,
+                payment_method=PaymentMethod.CARD,
+                card_details={
+                    "card_number": "5123456789012346",
+                    "card_exp_month": "03",
+                    "card_exp_year": "2030",
+                    "card_cvc": "100",
+                },
+                email="example@example.com",
+                reference_id="ref_12345",
+                browser_info=BROWSER_INFO,
+            )
+            request.connector_customer = "cus_131"
+            request.return_url = "www.google.com"
+
+            # TODO set connector and auth in headers
+            return client.PaymentAuthorize(
+                request, metadata=metadata, timeout=RPC_TIMEOUT_SECONDS, wait_for_ready=True
+            )
     except grpc.RpcError as e:
         print(f"RPC error: {e.code()}: {e.details()}", file=sys.stderr)
     except Exception as e:
         print(f"Error: {str(e)}", file=sys.stderr)
-    finally:
-        if 'channel' in locals():
-            channel.close()
 
 
 def make_payment_sync_request(url: str) -> Union[PaymentsSyncResponse, None]:
     """Send a payment sync request."""
     try:
-        channel = grpc.insecure_channel(url)
-        client = PaymentServiceStub(channel)
-        resource_id = get_env_variable("RESOURCE_ID", "pay_QHj9Thiy5mCC4Y")
-
-        # Create the request
-        request = PaymentsSyncRequest(
-            # connector=Connector.RAZORPAY,
-            # auth_creds=AuthType(
-            #     body_key=BodyKey(api_key=api_key, key1=key1)
-            # ),
-            resource_id=resource_id,
-            connector_request_reference_id="conn_req_abc",
-        )
-
-        # TODO set connector and auth in headers
-        return client.PaymentSync(request,metadata=metadata)
+        with grpc.insecure_channel(url) as channel:
+            client = PaymentServiceStub(channel)
+            resource_id = get_env_variable("RESOURCE_ID", "pay_QHj9Thiy5mCC4Y")
+
+            # Create the request
+            request = build_sync_request(
+                resource_id=resource_id,
+                reference_id="conn_req_abc",
+            )
+
+            # TODO set connector and auth in headers
+            return client.PaymentSync(
+                request, metadata=metadata, timeout=RPC_TIMEOUT_SECONDS, wait_for_ready=True
+            )
     except grpc.RpcError as e:
         print(f"RPC error: {e.code()}: {e.details()}", file=sys.stderr)
     except Exception as e:
         print(f"Error: {str(e)}", file=sys.stderr)
-    finally:
-        if 'channel' in locals():
-            channel.close()
 
 
 def main():